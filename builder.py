@@ -0,0 +1,344 @@
+# -*- coding: utf-8 -*-
+#
+# This copyrighted material is made available to anyone wishing to use,
+# modify, copy, or redistribute it subject to the terms and conditions of
+# the GNU General Public License v.2, or (at your option) any later version.
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY expressed or implied, including the implied warranties of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU General
+# Public License for more details.  You should have received a copy of the
+# GNU General Public License along with this program; if not, write to the
+# Free Software Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA
+# 02110-1301, USA.  Any Red Hat trademarks that are incorporated in the
+# source code or documentation are not subject to the GNU General Public
+# License and may only be used or replicated with the express permission of
+# Red Hat, Inc.
+#
+# Author(s): Vojtech Trefny <mail@vojtechtrefny.cz>
+#
+# ---------------------------------------------------------------------------- #
+
+import os
+import dnf
+import zlib
+import argparse
+import json
+import urllib.request
+import ssl
+import xml.etree.ElementTree as ET
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+
+from metadata import MetadataIndex
+from stats import CatalogStatistics, STATS_PATH
+from utils import XML_PATH
+
+# ---------------------------------------------------------------------------- #
+
+SHARDS_DIR = "data/shards"
+
+# ---------------------------------------------------------------------------- #
+
+
+def package_shard(name, num_shards):
+    """ Shard of the package (stable across processes and hosts) """
+
+    return zlib.crc32(name.encode("utf-8")) % num_shards
+
+
+def shard_path(shard, num_shards):
+    """ Path of the partial catalog built by given shard """
+
+    return os.path.join(SHARDS_DIR, "applications.%d-of-%d.xml" % (shard, num_shards))
+
+
+class XmlBuilder(object):
+    """ Class building XML with information for available packages
+
+        With 'metadata' (MetadataIndex) categories and tags are taken only
+        from it, without any network requests.
+
+        With 'num_shards' greater than one only packages from 'shard' are
+        processed and a partial catalog (without statistics) is written to
+        'xml_path', see 'merge_shards'.
+    """
+
+    def __init__(self, metadata=None, shard=0, num_shards=1, xml_path=XML_PATH):
+
+        self.metadata = metadata
+        self.shard = shard
+        self.num_shards = num_shards
+        self.xml_path = xml_path
+
+        # dnf initialization
+        self.base = dnf.Base()
+        self.base.read_all_repos()
+        self.base.fill_sack()
+
+        self._ignored_words = None
+
+        self.xml_root = ET.Element("root")
+        self.statistics = CatalogStatistics()
+        self._read_applications()
+
+    @property
+    def ignored_words(self):
+        """ Ignored words for term frequency analysis """
+
+        if self._ignored_words is None:
+            self._ignored_words = []
+
+            # no ignored words list present
+            if not os.path.isfile("data/ignored_words.txt"):
+                return self._ignored_words
+
+            with open("data/ignored_words.txt", "r") as f:
+                for line in f:
+                    if line.startswith("#"):
+                        continue
+                    self._ignored_words.append(line.strip())
+
+        return self._ignored_words
+
+    def _add_to_tree(self, pkg):
+        """ Add package to XML """
+
+        print(pkg.name)
+
+        app = ET.SubElement(self.xml_root, "application")
+
+        name = ET.SubElement(app, "name")
+        name.text = pkg.name
+        summary = ET.SubElement(app, "summary")
+        summary.text = pkg.summary
+        desc = ET.SubElement(app, "desc")
+        desc.text = pkg.description
+        category = ET.SubElement(app, "category")
+        category.text = self._get_category(pkg)
+
+        pkg_tags = self._get_tags(pkg)
+        tags = ET.SubElement(app, "tags")
+        for t in pkg_tags:
+            tag = ET.SubElement(tags, "tag")
+            tag.set("tag", t[0])
+            tag.set("value", t[1])
+
+        pkg_words = self._get_words(pkg)
+        words = ET.SubElement(app, "words")
+        for w in pkg_words:
+            word = ET.SubElement(words, "word")
+            word.set("word", w[0])
+            word.set("value", str(w[1]))
+
+        self.statistics.add(category.text, pkg_tags, pkg_words)
+
+    def _save_xml(self):
+        """ Export the XML file """
+
+        # write to a temporary file first, failed build never leaves
+        # a partial XML behind
+        with open(self.xml_path + ".tmp", "wb") as xml:
+            xml.write(ET.tostring(self.xml_root))
+        os.replace(self.xml_path + ".tmp", self.xml_path)
+
+        if self.num_shards == 1:
+            self.statistics.save(STATS_PATH)
+
+    def _read_applications(self):
+        """ Update the list of available applications """
+
+        query = self.base.sack.query()
+        packages = query.available()
+
+        _names = []
+
+        for pkg in packages:
+            #if not pkg.name.startswith(("0", "a")):
+            #    continue # XXX -- for testing only to avoid waiting for data
+            if pkg.name in _names:
+                continue
+            if self.num_shards > 1 and package_shard(pkg.name, self.num_shards) != self.shard:
+                continue
+            if self._is_app(pkg):
+                self._add_to_tree(pkg)
+                _names.append(pkg.name)
+
+        self._save_xml()
+
+    def _is_app(self, package):
+        for fname in package.files:
+            if fname.endswith(".desktop"):
+                return True
+
+        return False
+
+    def _get_tags(self, pkg):
+        """ Get package tags from Fedora Tagger application """
+
+        if self.metadata is not None:
+            return self.metadata.tags(pkg.name) or []
+
+        url = "https://apps.fedoraproject.org/tagger/api/v1/%s/" % pkg.name
+
+        try:
+            response = urllib.request.urlopen(url)
+        except urllib.error.HTTPError:
+            return []
+        else:
+            data = response.read().decode("utf-8")
+            parsed_data = json.loads(data)
+
+            tags = parsed_data["tags"]
+            parsed_tags = []
+
+            for tag in tags:
+                parsed_tags.append((tag["tag"], str(tag["total"])))
+
+        return parsed_tags
+
+    def _get_category(self, pkg):
+        """ Get package category from Fedora SCM database """
+
+        if self.metadata is not None:
+            return self.metadata.category(pkg.name) or "Other"
+
+        # try to get spec file from SCM
+        url = "https://pkgs.fedoraproject.org/cgit/%s.git/plain/%s.spec" % (pkg.name, pkg.name)
+        # pkgs.fedoraproject.org has an invalid certificate
+        context = ssl._create_unverified_context()
+        try:
+            response = urllib.request.urlopen(url, context=context)
+        except urllib.error.HTTPError:
+            return "Other"
+        else:
+            for line in response:
+                if line.startswith(b"Group:"):
+                    group = line.split()[-1].decode("utf-8")
+                    return group
+
+            return "Other"
+
+    def _get_words(self, pkg):
+        """ Term frequency analysis of pkg description """
+
+        word_frequency = Counter()
+
+        for word in pkg.description.lower().split():
+            if word.endswith((".", ",", "!", "?", ":", ";")):
+                word = word[:-1]
+            if word in ("*", "-"):
+                continue
+            if word not in self.ignored_words:
+                if word not in word_frequency.keys():
+                    word_frequency[word] = 1
+                else:
+                    word_frequency[word] += 1
+
+        return word_frequency.most_common(10)
+
+
+def build_shard(shard, num_shards, metadata=None):
+    """ Build one shard of the catalog """
+
+    os.makedirs(SHARDS_DIR, exist_ok=True)
+    XmlBuilder(metadata, shard=shard, num_shards=num_shards,
+               xml_path=shard_path(shard, num_shards))
+
+
+def merge_shards(num_shards, xml_path=XML_PATH):
+    """ Merge partial catalogs of all shards into the final catalog
+
+        Duplicate applications are removed and the statistics sidecar is
+        written for the merged catalog. Partial catalogs are removed after
+        the merge, so the next build starts from scratch.
+    """
+
+    missing = [shard for shard in range(num_shards)
+               if not os.path.isfile(shard_path(shard, num_shards))]
+    if missing:
+        raise RuntimeError("Shards %s not built yet" % ", ".join(str(shard) for shard in missing))
+
+    applications = {}
+    for shard in range(num_shards):
+        for app in ET.parse(shard_path(shard, num_shards)).getroot():
+            applications.setdefault(app[0].text, app)
+
+    root = ET.Element("root")
+    statistics = CatalogStatistics()
+
+    for name in sorted(applications.keys()):
+        app = applications[name]
+        root.append(app)
+        statistics.add(app[3].text,
+                       [(t.get("tag"), t.get("value")) for t in app[4]],
+                       [(w.get("word"), w.get("value")) for w in app[5]])
+
+    with open(xml_path + ".tmp", "wb") as xml:
+        xml.write(ET.tostring(root))
+    os.replace(xml_path + ".tmp", xml_path)
+
+    statistics.save(STATS_PATH)
+
+    for shard in range(num_shards):
+        os.remove(shard_path(shard, num_shards))
+
+
+def build_sharded(num_shards, workers=None, metadata=None):
+    """ Build all not yet built shards in worker processes and merge them
+
+        Shards which already have their partial catalog are not built again,
+        so failed shards can be retried just by running this again (until
+        the shards are merged).
+    """
+
+    shards = [shard for shard in range(num_shards)
+              if not os.path.isfile(shard_path(shard, num_shards))]
+
+    failed = []
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = {executor.submit(build_shard, shard, num_shards, metadata): shard
+                   for shard in shards}
+        for future, shard in futures.items():
+            try:
+                future.result()
+            except Exception as e:
+                print("Shard %d failed: %s" % (shard, e))
+                failed.append(shard)
+
+    if failed:
+        return failed
+
+    merge_shards(num_shards)
+
+    return []
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build the application catalog")
+    parser.add_argument("--specs", help="directory or tarball with spec files")
+    parser.add_argument("--tagger-dump", help="JSON dump of the Fedora Tagger tags")
+    parser.add_argument("--appstream", help="appstream XML (can be gzipped)")
+    parser.add_argument("--shards", type=int, default=1, help="number of shards to split the build to")
+    parser.add_argument("--shard", type=int, help="build only this shard (e.g. on another host)")
+    parser.add_argument("--merge", action="store_true", help="only merge already built shards")
+    parser.add_argument("--workers", type=int, help="number of worker processes for sharded build")
+    args = parser.parse_args()
+
+    if args.shards < 1:
+        parser.error("--shards must be at least 1")
+    if args.shard is not None and not 0 <= args.shard < args.shards:
+        parser.error("--shard must be between 0 and %d" % (args.shards - 1))
+
+    metadata = None
+    if args.specs or args.tagger_dump or args.appstream:
+        metadata = MetadataIndex(specs=args.specs, tagger_dump=args.tagger_dump,
+                                 appstream=args.appstream)
+
+    if args.shards == 1:
+        XmlBuilder(metadata)
+    elif args.merge:
+        merge_shards(args.shards)
+    elif args.shard is not None:
+        build_shard(args.shard, args.shards, metadata)
+    elif build_sharded(args.shards, args.workers, metadata):
+        parser.exit(1, "Some shards failed, run again to retry them.\n")
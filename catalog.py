@@ -0,0 +1,320 @@
+# -*- coding: utf-8 -*-
+#
+# This copyrighted material is made available to anyone wishing to use,
+# modify, copy, or redistribute it subject to the terms and conditions of
+# the GNU General Public License v.2, or (at your option) any later version.
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY expressed or implied, including the implied warranties of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU General
+# Public License for more details.  You should have received a copy of the
+# GNU General Public License along with this program; if not, write to the
+# Free Software Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA
+# 02110-1301, USA.  Any Red Hat trademarks that are incorporated in the
+# source code or documentation are not subject to the GNU General Public
+# License and may only be used or replicated with the express permission of
+# Red Hat, Inc.
+#
+# Author(s): Vojtech Trefny <mail@vojtechtrefny.cz>
+#
+# ---------------------------------------------------------------------------- #
+
+import os
+import sys
+import mmap
+import json
+import stat
+import zlib
+import struct
+import tempfile
+from array import array
+from collections.abc import Mapping
+
+from utils import XML_PATH, SHARED_CATALOG_PATH
+
+# ---------------------------------------------------------------------------- #
+
+# Catalog file layout (all integers native 64bit):
+#   header: magic, number of applications, offsets position, tags position,
+#           words position
+#   records: two JSON lists per app, features (name, category, tags, words)
+#            and texts (summary, desc)
+#   offsets: features and texts start positions (+ end of the last record)
+#   tags/words: number of keys, hash table size, key offsets, counts, hash
+#               table (key index + 1, 0 for empty slot), keys
+MAGIC = b"RECSYS02"
+HEADER = struct.Struct("=8sQQQQ")
+COUNTS_HEADER = struct.Struct("=QQ")
+
+# ---------------------------------------------------------------------------- #
+
+
+def _align(f):
+    """ Pad the file to 8 bytes so the arrays can be mapped directly """
+
+    f.write(b"\0" * (-f.tell() % 8))
+
+
+def _write_counts(f, counts):
+    keys = sorted(counts.keys())
+    encoded = [key.encode("utf-8") for key in keys]
+
+    # open addressing hash table at most half full
+    table_size = 1
+    while table_size < 2 * len(keys) + 1:
+        table_size *= 2
+    table = array("q", [0]) * table_size
+    for idx, key in enumerate(encoded):
+        slot = zlib.crc32(key) & (table_size - 1)
+        while table[slot]:
+            slot = (slot + 1) & (table_size - 1)
+        table[slot] = idx + 1
+
+    _align(f)
+    start = f.tell()
+    f.write(COUNTS_HEADER.pack(len(keys), table_size))
+
+    keys_start = start + COUNTS_HEADER.size + 8 * (len(keys) + 1) + 8 * len(keys) + 8 * table_size
+    offsets = array("Q", [keys_start])
+    for key in encoded:
+        offsets.append(offsets[-1] + len(key))
+
+    f.write(offsets.tobytes())
+    f.write(array("q", [counts[key] for key in keys]).tobytes())
+    f.write(table.tobytes())
+    f.write(b"".join(encoded))
+
+    return start
+
+
+def _check_range(buf, start, end):
+    """ Check that the data position is inside the buffer """
+
+    if not 0 <= start <= end <= len(buf):
+        raise ValueError("invalid catalog file (data out of range)")
+
+
+def _check_offsets(buf, offsets):
+    """ Check that offsets are ascending and point into the buffer """
+
+    offsets = offsets.tolist()
+    if offsets and (offsets[-1] > len(buf) or any(a > b for a, b in zip(offsets, offsets[1:]))):
+        raise ValueError("invalid catalog file (bad offsets)")
+
+
+def _write_catalog(fd, applications, all_tags, all_words):
+    """ Write the catalog data into an open file descriptor """
+
+    with os.fdopen(fd, "wb") as f:
+        f.write(b"\0" * HEADER.size)
+
+        offsets = array("Q")
+        for app in applications:
+            for record in ([app.name, app.category, app.tags, app.words], [app.summary, app.desc]):
+                offsets.append(f.tell())
+                f.write(json.dumps(record, separators=(",", ":")).encode("utf-8"))
+        offsets.append(f.tell())
+
+        _align(f)
+        offsets_pos = f.tell()
+        f.write(offsets.tobytes())
+
+        tags_pos = _write_counts(f, all_tags)
+        words_pos = _write_counts(f, all_words)
+
+        f.seek(0)
+        f.write(HEADER.pack(MAGIC, len(applications), offsets_pos, tags_pos, words_pos))
+
+
+def write_catalog(applications, path=SHARED_CATALOG_PATH):
+    """ Publish the catalog into a file for memory mapping
+
+        The file is replaced atomically so processes which already mapped
+        the old version keep using it. The directory should be writable
+        only by the publishing user (root).
+    """
+
+    from recommendation import count_vocabulary
+
+    all_tags, all_words = count_vocabulary(applications)
+
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, mode=0o755, exist_ok=True)
+
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".catalog-")
+    try:
+        _write_catalog(fd, applications, all_tags, all_words)
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+class SharedCounts(Mapping):
+    """ Read-only tag/word counts mapping backed by the mapped catalog
+
+        Keys are looked up in a hash table stored in the catalog, they are
+        compared as bytes without decoding. Counts of the looked up keys are
+        cached, scoring asks for the same tags and words repeatedly.
+    """
+
+    def __init__(self, buf, pos):
+        self._buf = buf
+
+        _check_range(buf, pos, pos + COUNTS_HEADER.size)
+        num, table_size = COUNTS_HEADER.unpack_from(buf, pos)
+        offsets_pos = pos + COUNTS_HEADER.size
+        values_pos = offsets_pos + 8 * (num + 1)
+        table_pos = values_pos + 8 * num
+        _check_range(buf, offsets_pos, table_pos + 8 * table_size)
+
+        self._num = num
+        self._cache = {}
+        self._offsets = memoryview(buf)[offsets_pos:values_pos].cast("Q")
+        self._values = memoryview(buf)[values_pos:table_pos].cast("q")
+        self._table = memoryview(buf)[table_pos:table_pos + 8 * table_size].cast("q")
+        _check_offsets(buf, self._offsets)
+
+        # table size is a power of two
+        self._mask = table_size - 1
+
+        table = self._table.tolist()
+        if table_size & self._mask or 0 not in table or min(table) < 0 or max(table) > num:
+            raise ValueError("invalid catalog file (bad hash table)")
+
+    def _find(self, key):
+        encoded = key.encode("utf-8")
+        buf, offsets, table, mask = self._buf, self._offsets, self._table, self._mask
+        slot = zlib.crc32(encoded) & mask
+
+        idx = table[slot]
+        while idx:
+            if buf[offsets[idx - 1]:offsets[idx]] == encoded:
+                return idx - 1
+            slot = (slot + 1) & mask
+            idx = table[slot]
+
+        return None
+
+    def __getitem__(self, key):
+        try:
+            return self._cache[key]
+        except KeyError:
+            pass
+
+        idx = self._find(key)
+        if idx is None:
+            raise KeyError(key)
+
+        value = self._cache[key] = self._values[idx]
+        return value
+
+    def get(self, key, default=None):
+        # not cached, used for one-time passes over the whole vocabulary
+        idx = self._find(key)
+        if idx is None:
+            return default
+        return self._values[idx]
+
+    def __contains__(self, key):
+        return self._find(key) is not None
+
+    def __iter__(self):
+        return (self._buf[self._offsets[i]:self._offsets[i + 1]].decode("utf-8")
+                for i in range(self._num))
+
+    def __len__(self):
+        return self._num
+
+    def values(self):
+        return self._values.tolist()
+
+
+class CatalogApplication(object):
+    """ Application from the shared catalog
+
+        Only name, category, tags and words are kept in the process, summary
+        and description are decoded from the shared memory when needed.
+    """
+
+    __slots__ = ("_catalog", "_index", "name", "category", "tags", "words",
+                 "rating", "installed", "recommended")
+
+    def __init__(self, catalog, index, name, category, tags, words):
+        self._catalog = catalog
+        self._index = index
+        self.name = name
+        self.category = category
+        self.tags = tags
+        self.words = words
+        self.rating = 0 # FIXME
+        self.installed = False
+        self.recommended = False
+
+    @property
+    def summary(self):
+        return self._catalog.texts(self._index)[0]
+
+    @property
+    def desc(self):
+        return self._catalog.texts(self._index)[1]
+
+
+class SharedCatalog(object):
+    """ Read-only catalog memory mapped from a file published by 'write_catalog'
+
+        Only files owned by root or the current user and not writable by
+        others are accepted, ValueError is raised otherwise.
+    """
+
+    def __init__(self, path=SHARED_CATALOG_PATH):
+
+        with open(path, "rb") as f:
+            info = os.fstat(f.fileno())
+            if info.st_uid not in (0, os.getuid()) or info.st_mode & (stat.S_IWGRP | stat.S_IWOTH):
+                raise ValueError("'%s' is not owned by root (or you) or is writable by others" % path)
+            if info.st_size < HEADER.size:
+                raise ValueError("'%s' is not a valid catalog file" % path)
+
+            self._buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, self._count, offsets_pos, tags_pos, words_pos = HEADER.unpack_from(self._buf, 0)
+        if magic != MAGIC:
+            raise ValueError("'%s' is not a valid catalog file" % path)
+
+        _check_range(self._buf, offsets_pos, offsets_pos + 8 * (2 * self._count + 1))
+        self._offsets = memoryview(self._buf)[offsets_pos:offsets_pos + 8 * (2 * self._count + 1)].cast("Q")
+        _check_offsets(self._buf, self._offsets)
+
+        self.all_tags = SharedCounts(self._buf, tags_pos)
+        self.all_words = SharedCounts(self._buf, words_pos)
+
+    def __len__(self):
+        return self._count
+
+    def _record(self, index):
+        return json.loads(self._buf[self._offsets[index]:self._offsets[index + 1]].decode("utf-8"))
+
+    def texts(self, index):
+        """ Summary and description of the application on given index """
+
+        return self._record(2 * index + 1)
+
+    def applications(self):
+        """ List of applications in this catalog """
+
+        applications = []
+
+        for index in range(self._count):
+            name, category, tags, words = self._record(2 * index)
+            applications.append(CatalogApplication(self, index, name, category,
+                                                   [tuple(tag) for tag in tags],
+                                                   [tuple(word) for word in words]))
+
+        return applications
+
+
+if __name__ == "__main__":
+    from reader import read_applications
+
+    write_catalog(read_applications(XML_PATH), *sys.argv[1:2])
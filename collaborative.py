@@ -0,0 +1,187 @@
+# -*- coding: utf-8 -*-
+#
+# This copyrighted material is made available to anyone wishing to use,
+# modify, copy, or redistribute it subject to the terms and conditions of
+# the GNU General Public License v.2, or (at your option) any later version.
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY expressed or implied, including the implied warranties of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU General
+# Public License for more details.  You should have received a copy of the
+# GNU General Public License along with this program; if not, write to the
+# Free Software Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA
+# 02110-1301, USA.  Any Red Hat trademarks that are incorporated in the
+# source code or documentation are not subject to the GNU General Public
+# License and may only be used or replicated with the express permission of
+# Red Hat, Inc.
+#
+# Author(s): Vojtech Trefny <mail@vojtechtrefny.cz>
+#
+# ---------------------------------------------------------------------------- #
+
+import os
+import sys
+
+import numpy
+from scipy import sparse
+from concurrent.futures import ThreadPoolExecutor
+
+from utils import CF_MODEL_PATH
+
+# ---------------------------------------------------------------------------- #
+
+
+def read_installed_sets(path):
+    """ Read installed sets from a directory with one file per machine
+
+        Every file contains names of the installed packages, one per line.
+    """
+
+    installed_sets = []
+
+    for fname in sorted(os.listdir(path)):
+        with open(os.path.join(path, fname), "r") as f:
+            names = set(line.strip() for line in f if line.strip() and not line.startswith("#"))
+        if names:
+            installed_sets.append(names)
+
+    return installed_sets
+
+
+class CollaborativeModel(object):
+    """ Implicit feedback collaborative filtering model (ALS)
+
+        Only item factors, their regularized gram matrix and the confidence
+        weight are stored. Scoring a user solves the same small (factors x
+        factors) system the user side of the training solves, followed by
+        one matrix-vector product with the item factors.
+    """
+
+    def __init__(self, items, item_factors, gram, alpha):
+        self.items = list(items)
+        self.item_factors = item_factors
+        self.gram = gram
+        self.alpha = alpha
+
+        self._item_index = {name: i for i, name in enumerate(self.items)}
+
+    @classmethod
+    def train(cls, installed_sets, factors=32, regularization=10.0, alpha=40.0,
+              iterations=15, min_count=2, batch_size=256, threads=None):
+        """ Train the model from a list of installed sets (one per machine)
+
+            Packages installed on less than 'min_count' machines are ignored.
+        """
+
+        counts = {}
+        for names in installed_sets:
+            for name in names:
+                counts[name] = counts.get(name, 0) + 1
+
+        items = sorted(name for name, num in counts.items() if num >= min_count)
+        item_index = {name: i for i, name in enumerate(items)}
+
+        rows = []
+        cols = []
+        for row, names in enumerate(installed_sets):
+            for name in names:
+                if name in item_index:
+                    rows.append(row)
+                    cols.append(item_index[name])
+
+        user_items = sparse.csr_matrix((numpy.ones(len(rows)), (rows, cols)),
+                                       shape=(len(installed_sets), len(items)))
+        item_users = user_items.T.tocsr()
+
+        random = numpy.random.RandomState(42)
+        user_factors = random.normal(scale=0.01, size=(user_items.shape[0], factors))
+        item_factors = random.normal(scale=0.01, size=(user_items.shape[1], factors))
+
+        with ThreadPoolExecutor(max_workers=threads) as executor:
+            for _i in range(iterations):
+                user_factors = cls._als_step(user_items, item_factors, regularization,
+                                             alpha, batch_size, executor)
+                item_factors = cls._als_step(item_users, user_factors, regularization,
+                                             alpha, batch_size, executor)
+
+        gram = item_factors.T.dot(item_factors) + regularization * numpy.eye(factors)
+
+        return cls(items, item_factors.astype(numpy.float32), gram, alpha)
+
+    @staticmethod
+    def _als_step(interactions, fixed, regularization, alpha, batch_size, executor):
+        """ Solve one side of the ALS problem with the other side fixed """
+
+        num_rows = interactions.shape[0]
+        factors = fixed.shape[1]
+        base = fixed.T.dot(fixed) + regularization * numpy.eye(factors)
+        solved = numpy.zeros((num_rows, factors))
+
+        def solve_batch(start):
+            end = min(start + batch_size, num_rows)
+            a = numpy.repeat(base[numpy.newaxis], end - start, axis=0)
+            b = numpy.zeros((end - start, factors))
+
+            for i, row in enumerate(range(start, end)):
+                idx = interactions.indices[interactions.indptr[row]:interactions.indptr[row + 1]]
+                if not len(idx):
+                    continue
+                fixed_row = fixed[idx]
+                # confidence is 1 + alpha for observed items, 1 otherwise
+                a[i] += alpha * fixed_row.T.dot(fixed_row)
+                b[i] = (1 + alpha) * fixed_row.sum(axis=0)
+
+            solved[start:end] = numpy.linalg.solve(a, b[..., numpy.newaxis])[..., 0]
+
+        list(executor.map(solve_batch, range(0, num_rows, batch_size)))
+
+        return solved
+
+    @classmethod
+    def load(cls, path=CF_MODEL_PATH):
+        """ Load the model saved by 'save' """
+
+        with numpy.load(path, allow_pickle=False) as data:
+            return cls(data["items"].tolist(), data["item_factors"], data["gram"],
+                       float(data["alpha"]))
+
+    def save(self, path=CF_MODEL_PATH):
+        """ Save the model in compressed numpy format """
+
+        numpy.savez_compressed(path, items=numpy.array(self.items),
+                               item_factors=self.item_factors,
+                               gram=self.gram, alpha=self.alpha)
+
+    def score(self, installed):
+        """ Scores of not installed items for given installed set
+
+            Scores are normalized to <0, 1>, only items with positive score
+            are returned.
+        """
+
+        idx = [self._item_index[name] for name in installed if name in self._item_index]
+        if not idx:
+            return {}
+
+        # user vector = (YtY + reg*I + alpha * YutYu)^-1 * (1 + alpha) * Yut * 1
+        installed_factors = self.item_factors[idx].astype(numpy.float64)
+        a = self.gram + self.alpha * installed_factors.T.dot(installed_factors)
+        b = (1 + self.alpha) * installed_factors.sum(axis=0)
+        user_vector = numpy.linalg.solve(a, b)
+
+        scores = self.item_factors.dot(user_vector)
+        scores[idx] = 0
+
+        best = scores.max()
+        if best <= 0:
+            return {}
+
+        return {self.items[i]: float(scores[i] / best) for i in numpy.flatnonzero(scores > 0)}
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 2:
+        print("Usage: %s <directory with installed sets>" % sys.argv[0])
+        sys.exit(1)
+
+    model = CollaborativeModel.train(read_installed_sets(sys.argv[1]))
+    model.save()
@@ -0,0 +1,204 @@
+# -*- coding: utf-8 -*-
+#
+# This copyrighted material is made available to anyone wishing to use,
+# modify, copy, or redistribute it subject to the terms and conditions of
+# the GNU General Public License v.2, or (at your option) any later version.
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY expressed or implied, including the implied warranties of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU General
+# Public License for more details.  You should have received a copy of the
+# GNU General Public License along with this program; if not, write to the
+# Free Software Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA
+# 02110-1301, USA.  Any Red Hat trademarks that are incorporated in the
+# source code or documentation are not subject to the GNU General Public
+# License and may only be used or replicated with the express permission of
+# Red Hat, Inc.
+#
+# Author(s): Vojtech Trefny <mail@vojtechtrefny.cz>
+#
+# ---------------------------------------------------------------------------- #
+
+import os
+import sys
+import math
+import time
+import random
+import argparse
+import tempfile
+
+from concurrent.futures import ProcessPoolExecutor
+
+from utils import Application, XML_PATH
+from reader import read_applications
+from recommendation import UserProfile, AppRecommendation, HashedWords
+from collaborative import CollaborativeModel, read_installed_sets
+
+# ---------------------------------------------------------------------------- #
+
+# applications and collaborative model loaded once in every worker process
+_catalog = None
+_catalog_names = None
+_collaborative = None
+_hashed_words = None
+
+# ---------------------------------------------------------------------------- #
+
+
+def synthetic_installed_sets(applications, num_users, seed=42):
+    """ Generate installed sets preferring few random categories per user """
+
+    rand = random.Random(seed)
+
+    by_category = {}
+    for app in applications:
+        by_category.setdefault(app.category, []).append(app.name)
+    categories = sorted(by_category.keys())
+
+    installed_sets = []
+    for _i in range(num_users):
+        installed = set()
+        for category in rand.sample(categories, min(3, len(categories))):
+            names = by_category[category]
+            installed.update(rand.sample(names, rand.randint(1, min(10, len(names)))))
+        # some noise from other categories
+        installed.update(app.name for app in rand.sample(applications, min(5, len(applications))))
+        installed_sets.append(installed)
+
+    return installed_sets
+
+
+def split_users(installed_sets, test_fraction=0.2, seed=42):
+    """ Split installed sets to (train, test) lists of users """
+
+    shuffled = list(installed_sets)
+    random.Random(seed).shuffle(shuffled)
+    num_test = max(1, int(len(shuffled) * test_fraction))
+
+    return shuffled[num_test:], shuffled[:num_test]
+
+
+def _init_worker(xml_path, cf_model_path, word_dimension):
+    global _catalog, _catalog_names, _collaborative, _hashed_words
+
+    _catalog = read_applications(xml_path)
+    _catalog_names = set(app.name for app in _catalog)
+    if cf_model_path:
+        _collaborative = CollaborativeModel.load(cf_model_path)
+    if word_dimension:
+        _hashed_words = HashedWords(word_dimension)
+
+
+def _dcg(relevance):
+    return sum(rel / math.log2(pos + 2) for pos, rel in enumerate(relevance))
+
+
+def _evaluate_user(args):
+    """ Hold out part of installed set, recommend and compute metrics @k """
+
+    installed, holdout, k, seed = args
+
+    names = sorted(name for name in installed if name in _catalog_names)
+    if len(names) < 2:
+        return None
+
+    rand = random.Random(seed)
+    rand.shuffle(names)
+    num_hidden = max(1, int(len(names) * holdout))
+    hidden = set(names[:num_hidden])
+    visible = set(names[num_hidden:])
+
+    applications = []
+    for app in _catalog:
+        new_app = Application(**vars(app))
+        new_app.installed = app.name in visible
+        applications.append(new_app)
+
+    start = time.perf_counter()
+    profile = UserProfile(applications, hashed_words=_hashed_words)
+    recommended = [app.name for app, _factor in AppRecommendation(profile, _collaborative).ranked[:k]]
+    latency = time.perf_counter() - start
+
+    hits = [1 if name in hidden else 0 for name in recommended]
+    ideal = _dcg([1] * min(len(hidden), k))
+
+    return {"precision": sum(hits) / k,
+            "recall": sum(hits) / len(hidden),
+            "ndcg": _dcg(hits) / ideal,
+            "latency": latency}
+
+
+def _percentile(values, percent):
+    values = sorted(values)
+    idx = min(len(values) - 1, int(math.ceil(percent / 100 * len(values))) - 1)
+    return values[max(0, idx)]
+
+
+def evaluate(installed_sets, k=10, holdout=0.2, xml_path=XML_PATH, cf_model_path=None,
+             word_dimension=None, workers=None, seed=42):
+    """ Evaluate recommendation quality and latency on given installed sets """
+
+    tasks = [(installed, holdout, k, seed + i) for i, installed in enumerate(installed_sets)]
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(xml_path, cf_model_path, word_dimension)) as executor:
+        results = [r for r in executor.map(_evaluate_user, tasks, chunksize=16) if r is not None]
+
+    if not results:
+        return {}
+
+    latencies = [r["latency"] for r in results]
+
+    return {"users": len(results),
+            "precision@%d" % k: sum(r["precision"] for r in results) / len(results),
+            "recall@%d" % k: sum(r["recall"] for r in results) / len(results),
+            "ndcg@%d" % k: sum(r["ndcg"] for r in results) / len(results),
+            "latency_p50": _percentile(latencies, 50),
+            "latency_p90": _percentile(latencies, 90),
+            "latency_p99": _percentile(latencies, 99)}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Offline evaluation of the recommendations")
+    parser.add_argument("--installed", help="directory with installed sets (one file per machine)")
+    parser.add_argument("--synthetic", type=int, default=200,
+                        help="number of synthetic users when no installed sets are given")
+    parser.add_argument("-k", type=int, default=10, help="length of the evaluated recommendation list")
+    parser.add_argument("--holdout", type=float, default=0.2, help="fraction of installed apps to hide")
+    parser.add_argument("--cf-model", help="collaborative filtering model to blend with")
+    parser.add_argument("--train-cf", type=float, metavar="TEST_FRACTION",
+                        help="train the collaborative model on the installed sets except "
+                             "given fraction of users which are evaluated")
+    parser.add_argument("--hashed-words", type=int, metavar="DIMENSION",
+                        help="use hashed words features with given dimension")
+    parser.add_argument("--workers", type=int, help="number of worker processes")
+    args = parser.parse_args()
+
+    if args.installed:
+        installed_sets = read_installed_sets(args.installed)
+    else:
+        installed_sets = synthetic_installed_sets(read_applications(XML_PATH), args.synthetic)
+
+    if args.train_cf and args.cf_model:
+        parser.error("--train-cf and --cf-model can't be used together")
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        cf_model_path = args.cf_model
+
+        if args.train_cf:
+            # held out users must not be seen by the model
+            train_sets, installed_sets = split_users(installed_sets, args.train_cf)
+            cf_model_path = os.path.join(tmp_dir, "cf_model.npz")
+            CollaborativeModel.train(train_sets).save(cf_model_path)
+        elif args.cf_model and args.installed:
+            print("Warning: if '%s' was trained on the evaluated installed sets, the results "
+                  "are too optimistic, use --train-cf instead." % args.cf_model, file=sys.stderr)
+
+        report = evaluate(installed_sets, k=args.k, holdout=args.holdout,
+                          cf_model_path=cf_model_path, word_dimension=args.hashed_words,
+                          workers=args.workers)
+
+    for key, value in report.items():
+        if key.startswith("latency"):
+            print("%s: %.1f ms" % (key, value * 1000))
+        else:
+            print("%s: %s" % (key, value))
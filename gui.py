@@ -21,17 +21,25 @@
 import gi
 gi.require_version("Gtk", "3.0")
 gi.require_version("Gdk", "3.0")
-from gi.repository import Gtk, Gdk
+gi.require_version("GdkPixbuf", "2.0")
+from gi.repository import Gtk, Gdk, GdkPixbuf, GLib
 
 import os
+import sys
+import time
 
-from utils import AppReader
+from reader import AppReader
+from treemodel import CatalogTreeModel
 
 # ---------------------------------------------------------------------------- #
 
 class GUI(object):
 
-    def __init__(self):
+    def __init__(self, start_time=None, quit_when_shown=False, word_dimension=None):
+
+        # startup time measurement
+        self.start_time = start_time
+        self.quit_when_shown = quit_when_shown
 
         # builder
         self.builder = Gtk.Builder()
@@ -39,21 +47,21 @@ class GUI(object):
 
         # main window
         self.main_window = self.builder.get_object("main_window")
-        self.main_window.connect("delete-event", Gtk.main_quit)
+        self.main_window.connect("delete-event", self.on_quit)
+        self._shown_handler = self.main_window.connect("draw", self.on_first_draw)
         self.applications_list = self.builder.get_object("box_list")
         self.applications_view = self.builder.get_object("box_application")
 
-        self.data = AppReader()
+        self.data = AppReader(word_dimension=word_dimension)
 
         # radio buttons
         for button_name in ("rec", "inst", "all"):
             button = self.builder.get_object("radiobutton_%s" % button_name)
             button.connect("toggled", self.on_button_toggled, button_name)
 
-        # view filtering
+        # view type (recommended, installed or all available)
         self.view_type = "rec"
-        self.view_filter = self.builder.get_object("treemodelfilter_applications")
-        self.view_filter.set_visible_func(self._filter_func)
+        self.app_model = None
 
         # view onclick
         self.treeview_applications = self.builder.get_object("treeview_applications")
@@ -66,8 +74,21 @@ class GUI(object):
         # list of applications
         self.update_app_list()
 
-        # debug information
-        self.add_user_debug()
+        # debug information (computed only when the expander is opened)
+        self.expander_debug = self.builder.get_object("expander_debug")
+        self.expander_debug.connect("notify::expanded", self.on_debug_expanded)
+        self.expander_debug2 = self.builder.get_object("expander_debug2")
+        self.expander_debug2.connect("notify::expanded", self.on_app_debug_expanded)
+
+        # application shown in the detail view
+        self.shown_app = None
+
+        # recommendations and watching for installed packages changes
+        # are not needed to show the window, start them when idle
+        self._rec_future = None
+        GLib.idle_add(self.request_recommended)
+        self.watcher = None
+        GLib.idle_add(self._start_watcher)
 
         self.main_window.show_all()
 
@@ -75,11 +96,13 @@ class GUI(object):
         self.applications_view.hide()
 
     def update_app_list(self):
-        apps = self.data.applications
-        store = self.builder.get_object("applications_store")
+        self.app_model = CatalogTreeModel(self.data.applications, self._get_summary,
+                                          lambda app: self._get_icon(app, 64),
+                                          self.view_type)
+        self.treeview_applications.set_model(self.app_model)
 
-        for app in apps:
-            store.append(None, [app, app.recommended, app.installed, self._get_icon(app, 64), self._get_summary(app)])
+    def update_app_rows(self, apps):
+        self.app_model.update(apps)
 
     def update_app_view(self, app):
         self.applications_list.hide()
@@ -91,6 +114,20 @@ class GUI(object):
         label_long = self.builder.get_object("label_long_description")
         label_long.set_markup(self._get_description(app))
 
+        self._update_install_button(app)
+
+        image_icon = self.builder.get_object("image_icon")
+        if os.path.isfile("data/icons/64x64/%s.png" % app.name):
+            image_icon.set_from_file("data/icons/64x64/%s.png" % app.name)
+
+        self.shown_app = app
+
+        label_debug = self.builder.get_object("label_app_debug")
+        label_debug.set_markup("")
+        if self.expander_debug2.get_expanded():
+            self.update_app_debug(app)
+
+    def _update_install_button(self, app):
         button_install = self.builder.get_object("button_install")
         if app.installed:
             button_install.set_label("Already installed")
@@ -99,25 +136,126 @@ class GUI(object):
             button_install.set_label("Install")
             button_install.set_sensitive(True)
 
-        image_icon = self.builder.get_object("image_icon")
-        if os.path.isfile("data/icons/64x64/%s.png" % app.name):
-            image_icon.set_from_file("data/icons/64x64/%s.png" % app.name)
+    def update_app_debug(self, app):
+        future = self.data.explain(app)
+        future.add_done_callback(lambda f: GLib.idle_add(self._on_app_debug, app, f))
 
-        label_debug = self.builder.get_object("label_app_debug")
-        label_debug.set_markup(str(app.recommended_debug))
+    def update_user_debug(self):
+        future = self.data.profile_summary()
+        future.add_done_callback(lambda f: GLib.idle_add(self._on_user_debug, f))
+
+    def request_recommended(self):
+        future = self.data.recommend()
+
+        # each computation needs only one callback
+        if future is not self._rec_future:
+            self._rec_future = future
+            future.add_done_callback(lambda f: GLib.idle_add(self._on_recommended, f))
+
+        return False
+
+    def _future_result(self, future):
+        """ Result of the background computation or None if it was cancelled
+            or failed
+        """
+
+        if future.cancelled():
+            return None
+
+        error = future.exception()
+        if error is not None:
+            print("Background computation failed: %s" % error, file=sys.stderr)
+            return None
+
+        return future.result()
+
+    def _on_recommended(self, future):
+        result = self._future_result(future)
+        if result is None:
+            return False
 
-    def add_user_debug(self):
-        label_debug = self.builder.get_object("label_main_debug")
-        label_debug.set_markup(str(self.data.user_profile))
+        changed = self.data.apply_recommended(*result)
+        if changed:
+            self.update_app_rows(changed)
+
+        return False
+
+    def _on_app_debug(self, app, future):
+        result = self._future_result(future)
+        if result is not None and app is self.shown_app:
+            label_debug = self.builder.get_object("label_app_debug")
+            label_debug.set_markup(result)
+
+        return False
+
+    def _on_user_debug(self, future):
+        result = self._future_result(future)
+        if result is not None:
+            label_debug = self.builder.get_object("label_main_debug")
+            label_debug.set_markup(result)
+
+        return False
+
+    def _start_watcher(self):
+        # rpm and Gio monitor are not needed to show the window
+        from watcher import RpmdbWatcher
+
+        self.watcher = RpmdbWatcher(self.data.installed, self.on_installed_changed)
+
+        return False
+
+    def on_first_draw(self, window, cr):
+        window.disconnect(self._shown_handler)
+
+        if self.start_time is not None:
+            print("Main window shown after %.3f s" % (time.perf_counter() - self.start_time))
+
+        if self.quit_when_shown:
+            GLib.idle_add(Gtk.main_quit)
+
+    def on_installed_changed(self, added, removed):
+        changed = self.data.update_installed(added, removed)
+        if not changed:
+            return
+
+        self.update_app_rows(changed)
+        self.request_recommended()
+
+        if self.shown_app in changed:
+            self._update_install_button(self.shown_app)
+
+        if self.expander_debug.get_expanded():
+            self.update_user_debug()
+
+        if self.shown_app is not None and self.expander_debug2.get_expanded():
+            self.update_app_debug(self.shown_app)
+
+    def on_debug_expanded(self, expander, param):
+        if expander.get_expanded():
+            self.update_user_debug()
+
+    def on_app_debug_expanded(self, expander, param):
+        if expander.get_expanded() and self.shown_app is not None:
+            self.update_app_debug(self.shown_app)
+
+    def on_quit(self, window, event):
+        self.data.close()
+        Gtk.main_quit()
 
     def on_back_clicked(self, button):
+        self.shown_app = None
         self.applications_list.show()
         self.applications_view.hide()
 
     def on_button_toggled(self, button, name):
-        if button.get_active():
-            self.view_type = name
-        self.view_filter.refilter()
+        if not button.get_active():
+            return
+
+        self.view_type = name
+
+        self.treeview_applications.set_model(None)
+        self.app_model.set_view(name)
+        self.treeview_applications.set_model(self.app_model)
 
     def on_app_doubleclick(self, treeview, event):
         if event.type == Gdk.EventType._2BUTTON_PRESS:
@@ -127,22 +265,12 @@ class GUI(object):
             app = model.get_value(model.get_iter(path), 0)
             self.update_app_view(app)
 
-    def _filter_func(self, model, iter, data):
-        if self.view_type == "rec":
-            return model[iter][1]
-        elif self.view_type == "inst":
-            return model[iter][2]
-        else:
-            return not model[iter][2]
-
     def _safe_markup(self, string):
-        string = string.replace("&", "&amp;")
-        return string
+        return GLib.markup_escape_text(string)
 
     def _get_icon(self, app, size):
         if os.path.isfile("data/icons/%dx%d/%s.png" % (size, size, app.name)):
-            icon = Gtk.Image(file="data/icons/%dx%d/%s.png" % (size, size, app.name))
-            return icon.get_pixbuf()
+            return GdkPixbuf.Pixbuf.new_from_file("data/icons/%dx%d/%s.png" % (size, size, app.name))
 
     def _get_summary(self, app):
         name = self._safe_markup(app.name)
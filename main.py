@@ -18,7 +18,11 @@
 #
 # ---------------------------------------------------------------------------- #
 
+import time
+START_TIME = time.perf_counter()
+
 import signal
+import argparse
 
 import gi
 
@@ -32,5 +36,16 @@ from gui import GUI
 if __name__ == '__main__':
 
     signal.signal(signal.SIGINT, signal.SIG_DFL)
-    GUI()
+
+    parser = argparse.ArgumentParser(description="Application recommendation")
+    parser.add_argument("--startup-time", action="store_true",
+                        help="print time until the main window is shown and quit")
+    parser.add_argument("--hashed-words", type=int, metavar="DIMENSION",
+                        help="use hashed words features with given dimension")
+    args = parser.parse_args()
+
+    if args.startup_time:
+        GUI(start_time=START_TIME, quit_when_shown=True, word_dimension=args.hashed_words)
+    else:
+        GUI(word_dimension=args.hashed_words)
     Gtk.main()
@@ -0,0 +1,183 @@
+# -*- coding: utf-8 -*-
+#
+# This copyrighted material is made available to anyone wishing to use,
+# modify, copy, or redistribute it subject to the terms and conditions of
+# the GNU General Public License v.2, or (at your option) any later version.
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY expressed or implied, including the implied warranties of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU General
+# Public License for more details.  You should have received a copy of the
+# GNU General Public License along with this program; if not, write to the
+# Free Software Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA
+# 02110-1301, USA.  Any Red Hat trademarks that are incorporated in the
+# source code or documentation are not subject to the GNU General Public
+# License and may only be used or replicated with the express permission of
+# Red Hat, Inc.
+#
+# Author(s): Vojtech Trefny <mail@vojtechtrefny.cz>
+#
+# ---------------------------------------------------------------------------- #
+
+import os
+import gzip
+import json
+import tarfile
+import xml.etree.ElementTree as ET
+
+# ---------------------------------------------------------------------------- #
+
+# appstream (freedesktop) categories mapped to the RPM groups used by the
+# spec files, so one catalog uses only one naming scheme; additional
+# categories are more specific than the main ones and are preferred
+APPSTREAM_ADDITIONAL_GROUPS = {"TextEditor": "Applications/Editors",
+                               "WordProcessor": "Applications/Publishing",
+                               "Publishing": "Applications/Publishing",
+                               "Archiving": "Applications/Archiving",
+                               "Compression": "Applications/Archiving",
+                               "Emulator": "Applications/Emulators",
+                               "Database": "Applications/Databases",
+                               "FileManager": "Applications/File",
+                               "Chat": "Applications/Communications",
+                               "InstantMessaging": "Applications/Communications",
+                               "Telephony": "Applications/Communications",
+                               "Debugger": "Development/Debuggers"}
+APPSTREAM_MAIN_GROUPS = {"AudioVideo": "Applications/Multimedia",
+                         "Audio": "Applications/Multimedia",
+                         "Video": "Applications/Multimedia",
+                         "Graphics": "Applications/Multimedia",
+                         "Development": "Development/Tools",
+                         "Education": "Applications/Engineering",
+                         "Science": "Applications/Engineering",
+                         "Game": "Amusements/Games",
+                         "Network": "Applications/Internet",
+                         "Office": "Applications/Productivity",
+                         "Settings": "Applications/System",
+                         "System": "Applications/System",
+                         "Utility": "Applications/System"}
+
+# attribute of translated appstream elements
+XML_LANG = "{http://www.w3.org/XML/1998/namespace}lang"
+
+# ---------------------------------------------------------------------------- #
+
+
+def _appstream_group(categories):
+    """ RPM group for list of appstream categories or None """
+
+    for groups in (APPSTREAM_ADDITIONAL_GROUPS, APPSTREAM_MAIN_GROUPS):
+        for category in categories:
+            if category in groups:
+                return groups[category]
+
+    return None
+
+
+def _spec_group(lines):
+    """ Value of the 'Group:' tag from spec file lines (bytes) """
+
+    for line in lines:
+        if line.startswith(b"Group:"):
+            return line.split()[-1].decode("utf-8")
+
+    return None
+
+
+class MetadataIndex(object):
+    """ Package categories and tags read in bulk from local sources
+
+        Supported sources are a directory or tarball with spec files, a dump
+        of the Fedora Tagger tags and appstream metadata. Spec file groups
+        are preferred to appstream categories and Tagger tags to appstream
+        keywords. Appstream categories are mapped to the RPM groups, so all
+        categories use the spec file naming.
+    """
+
+    def __init__(self, specs=None, tagger_dump=None, appstream=None):
+
+        self._categories = {}
+        self._tags = {}
+
+        # load less preferred sources first, the others overwrite them
+        if appstream:
+            self.load_appstream(appstream)
+        if specs:
+            self.load_specs(specs)
+        if tagger_dump:
+            self.load_tagger_dump(tagger_dump)
+
+    def load_specs(self, path):
+        """ Read groups from a directory or a tarball with spec files """
+
+        if os.path.isdir(path):
+            for dirpath, _dirnames, filenames in os.walk(path):
+                for fname in filenames:
+                    if not fname.endswith(".spec"):
+                        continue
+                    with open(os.path.join(dirpath, fname), "rb") as f:
+                        group = _spec_group(f)
+                    if group:
+                        self._categories[fname[:-len(".spec")]] = group
+        else:
+            with tarfile.open(path) as tar:
+                for member in tar:
+                    if not member.isfile() or not member.name.endswith(".spec"):
+                        continue
+                    group = _spec_group(tar.extractfile(member))
+                    if group:
+                        self._categories[os.path.basename(member.name)[:-len(".spec")]] = group
+
+    def load_tagger_dump(self, path):
+        """ Read tags from a JSON dump of the Fedora Tagger
+
+            The dump is either a list of objects with 'name' and 'tags' or
+            an object mapping package names to objects with 'tags'; tags are
+            in the Tagger API format ({"tag": ..., "total": ...}).
+        """
+
+        with open(path, "r") as f:
+            data = json.load(f)
+
+        if isinstance(data, dict):
+            packages = ((name, pkg["tags"]) for name, pkg in data.items())
+        else:
+            packages = ((pkg["name"], pkg["tags"]) for pkg in data)
+
+        for name, tags in packages:
+            self._tags[name] = [(tag["tag"], str(tag["total"])) for tag in tags]
+
+    def load_appstream(self, path):
+        """ Read categories (as RPM groups) and keywords (as tags) from
+            appstream XML
+        """
+
+        opener = gzip.open if path.endswith(".gz") else open
+
+        with opener(path, "rb") as f:
+            for _event, component in ET.iterparse(f):
+                if component.tag != "component":
+                    continue
+
+                name = component.findtext("pkgname")
+                if name:
+                    group = _appstream_group([c.text for c in component.iterfind("categories/category")])
+                    if group:
+                        self._categories[name] = group
+
+                    # only untranslated keywords, all locales would pollute the tags
+                    keywords = [k.text.lower() for k in component.iterfind("keywords/keyword")
+                                if k.text and XML_LANG not in k.attrib]
+                    keywords = list(dict.fromkeys(keywords))
+                    if keywords:
+                        self._tags[name] = [(keyword, "1") for keyword in keywords]
+
+                component.clear()
+
+    def category(self, name):
+        """ Category of the package or None if not known """
+
+        return self._categories.get(name)
+
+    def tags(self, name):
+        """ Tags of the package or None if not known """
+
+        return self._tags.get(name)
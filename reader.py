@@ -0,0 +1,356 @@
+# -*- coding: utf-8 -*-
+#
+# This copyrighted material is made available to anyone wishing to use,
+# modify, copy, or redistribute it subject to the terms and conditions of
+# the GNU General Public License v.2, or (at your option) any later version.
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY expressed or implied, including the implied warranties of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU General
+# Public License for more details.  You should have received a copy of the
+# GNU General Public License along with this program; if not, write to the
+# Free Software Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA
+# 02110-1301, USA.  Any Red Hat trademarks that are incorporated in the
+# source code or documentation are not subject to the GNU General Public
+# License and may only be used or replicated with the express permission of
+# Red Hat, Inc.
+#
+# Author(s): Vojtech Trefny <mail@vojtechtrefny.cz>
+#
+# ---------------------------------------------------------------------------- #
+
+import os
+import sys
+import threading
+import xml.etree.ElementTree as ET
+from concurrent.futures import ThreadPoolExecutor
+
+from utils import Application, XML_PATH, CF_MODEL_PATH, SHARED_CATALOG_PATH
+
+# ---------------------------------------------------------------------------- #
+
+
+def read_applications(xml_path=XML_PATH):
+    """ Read list of applications from the XML (none installed or recommended) """
+
+    applications = []
+
+    tree = ET.parse(xml_path)
+    root = tree.getroot()
+
+    for app in root:
+        name = app[0].text
+        summary = app[1].text
+        desc = app[2].text
+        category = app[3].text
+        tags = [(t.get("tag"), int(t.get("value"))) for t in app[4]]
+        words = [(w.get("word"), int(w.get("value"))) for w in app[5]]
+        rating = 0 # FIXME
+
+        new_app = Application(name=name, summary=summary, desc=desc,
+                              category=category, tags=tags, words=words,
+                              rating=rating, installed=False,
+                              recommended=False)
+
+        applications.append(new_app)
+
+    applications.sort(key=lambda x: x.name.lower())
+
+    return applications
+
+
+def read_installed_names():
+    """ Names of installed packages read directly from the rpmdb
+
+        This is much faster than filling the dnf sack, only local rpmdb
+        is needed for the installed packages.
+    """
+
+    import rpm
+
+    ts = rpm.TransactionSet()
+    return set(hdr[rpm.RPMTAG_NAME] for hdr in ts.dbMatch())
+
+
+class AppReader(object):
+    """ Class reading application information from pre-prepared XML file
+
+        If a shared catalog (see catalog.py) is published, it is used instead
+        of the XML and only installed applications and the user profile are
+        kept in this process.
+
+        'word_dimension' enables hashed words features (recommendation.HashedWords)
+        with given number of buckets in the user profile.
+
+        User profile and recommendations are computed lazily in a background
+        thread, see 'recommend', 'explain' and 'profile_summary'. All work
+        with the profile is done in this thread.
+    """
+
+    def __init__(self, catalog_path=None, word_dimension=None):
+
+        self._catalog = None
+        self._word_dimension = word_dimension
+
+        if catalog_path is not None:
+            from catalog import SharedCatalog
+            self._catalog = SharedCatalog(catalog_path)
+        elif self._shared_catalog_current():
+            from catalog import SharedCatalog
+            try:
+                self._catalog = SharedCatalog(SHARED_CATALOG_PATH)
+            except (OSError, ValueError) as e:
+                print("Not using the shared catalog: %s" % e, file=sys.stderr)
+
+        if self._catalog is None and not os.path.isfile(XML_PATH):
+            # builder needs dnf and network access, load it only when needed
+            from builder import XmlBuilder
+            XmlBuilder()
+
+        self._applications = []
+        self._installed = set()
+        self._user_profile = None
+        self._recommendation = None
+
+        # background computation of the profile and recommendations
+        self._executor = ThreadPoolExecutor(max_workers=1)
+        self._lock = threading.Lock()
+        self._pending = []              # (app, installed) not applied to the profile yet
+        self._stale_categories = set()  # categories to re-score (worker thread only)
+        self._generation = 0            # incremented on every installed set change
+        self._computing = None          # generation being computed (worker thread)
+        self._future = None
+        self._explain_future = None
+        self._summary_future = None
+
+        self._read_applications()
+
+    @staticmethod
+    def _shared_catalog_current():
+        """ Whether the shared catalog exists and is not older than the XML """
+
+        if not os.path.isfile(SHARED_CATALOG_PATH):
+            return False
+
+        return not os.path.isfile(XML_PATH) or \
+            os.path.getmtime(SHARED_CATALOG_PATH) >= os.path.getmtime(XML_PATH)
+
+    @property
+    def applications(self):
+        """ List of available applications """
+
+        if not self._applications:
+            self._read_applications()
+
+        return self._applications
+
+    @property
+    def installed(self):
+        """ Set of installed package names """
+
+        if not self._installed:
+            self._read_installed()
+
+        return self._installed
+
+    @property
+    def user_profile(self):
+        """ User profile """
+
+        if not self._user_profile:
+            from recommendation import UserProfile, HashedWords
+
+            hashed_words = None
+            if self._word_dimension:
+                hashed_words = HashedWords(self._word_dimension)
+
+            if self._catalog is not None:
+                self._user_profile = UserProfile(self.applications, self._catalog.all_tags,
+                                                 self._catalog.all_words, hashed_words)
+            else:
+                self._user_profile = UserProfile(self.applications,
+                                                 hashed_words=hashed_words)
+
+        return self._user_profile
+
+    @property
+    def recommendation(self):
+        """ Recommendation """
+
+        if not self._recommendation:
+            from recommendation import AppRecommendation
+
+            collaborative = None
+            if os.path.isfile(CF_MODEL_PATH):
+                from collaborative import CollaborativeModel
+                collaborative = CollaborativeModel.load(CF_MODEL_PATH)
+            self._recommendation = AppRecommendation(self.user_profile, collaborative,
+                                                     cancelled=self._outdated)
+
+        return self._recommendation
+
+    def _read_applications(self):
+        """ Update the list of available applications from the XML """
+
+        if self._catalog is not None:
+            self._applications = self._catalog.applications()
+        else:
+            self._applications = read_applications(XML_PATH)
+
+        for app in self._applications:
+            app.installed = self._get_installed(app.name)
+
+    def _read_installed(self):
+        """ Update the list of installed applications """
+
+        self._installed = read_installed_names()
+
+    def update_installed(self, added, removed):
+        """ Apply changes of installed packages
+
+            Profile is updated (only by the changed applications) when the
+            recommendations are computed again, running computation is
+            cancelled. Returns set of applications which changed their
+            installed state.
+        """
+
+        changed = set()
+
+        with self._lock:
+            for app in self.applications:
+                if app.name in added and not app.installed:
+                    app.installed = True
+                elif app.name in removed and app.installed:
+                    app.installed = False
+                else:
+                    continue
+                changed.add(app)
+                self._pending.append((app, app.installed))
+
+            self._installed = (self.installed - removed) | added
+
+        if changed:
+            # running computation stops at the next check, see '_outdated'
+            self._generation += 1
+            self._cancel_futures()
+            self._future = None
+
+        return changed
+
+    def _outdated(self):
+        """ Whether the running computation is for an outdated installed set """
+
+        return self._computing is not None and self._computing != self._generation
+
+    def _cancel_futures(self):
+        for future in (self._future, self._explain_future, self._summary_future):
+            if future is not None:
+                future.cancel()
+
+    def _sync_profile(self):
+        """ Create the profile or apply pending installed changes to it
+            (worker thread)
+        """
+
+        with self._lock:
+            pending, self._pending = self._pending, []
+
+            if self._user_profile is None:
+                # new profile already reflects the pending changes
+                return self.user_profile
+
+        for app, installed in pending:
+            if installed:
+                self._user_profile.add_installed(app)
+            else:
+                self._user_profile.remove_installed(app)
+            self._stale_categories.add(app.category)
+
+        return self._user_profile
+
+    def _recommend(self, generation):
+        from recommendation import RecommendationCancelled
+
+        self._computing = generation
+        try:
+            self._sync_profile()
+
+            if self._stale_categories and self._recommendation is not None:
+                self._recommendation.update(self._stale_categories)
+            self._stale_categories = set()
+
+            return generation, set(self.recommendation.recommended)
+        except RecommendationCancelled:
+            # ignored by 'apply_recommended', stale categories are kept
+            return generation, set()
+        finally:
+            self._computing = None
+
+    def recommend(self):
+        """ Future with (generation, names of recommended applications)
+
+            The computation is started on the first call after start or
+            installed set change, use 'apply_recommended' with the result.
+        """
+
+        if self._future is None:
+            self._future = self._executor.submit(self._recommend, self._generation)
+
+        return self._future
+
+    def apply_recommended(self, generation, recommended):
+        """ Update recommended flags of the applications, results computed
+            for an outdated installed set are ignored
+
+            Returns set of applications which changed their recommended state.
+        """
+
+        changed = set()
+
+        if generation != self._generation:
+            return changed
+
+        for app in self.applications:
+            if app.recommended != (app.name in recommended):
+                app.recommended = app.name in recommended
+                changed.add(app)
+
+        return changed
+
+    def _explain(self, app):
+        self._sync_profile()
+        return str(self.recommendation.explain(app))
+
+    def explain(self, app):
+        """ Future with debug information about recommendation of the app,
+            explanation of the previously asked app is cancelled
+        """
+
+        if self._explain_future is not None:
+            self._explain_future.cancel()
+        self._explain_future = self._executor.submit(self._explain, app)
+
+        return self._explain_future
+
+    def _profile_summary(self):
+        return str(self._sync_profile())
+
+    def profile_summary(self):
+        """ Future with the user profile summary, previously asked summary
+            is cancelled
+        """
+
+        if self._summary_future is not None:
+            self._summary_future.cancel()
+        self._summary_future = self._executor.submit(self._profile_summary)
+
+        return self._summary_future
+
+    def close(self):
+        """ Stop the background computation """
+
+        self._cancel_futures()
+        self._generation += 1
+        self._executor.shutdown(wait=False)
+
+    def _get_installed(self, app_name):
+        return app_name in self.installed
@@ -0,0 +1,566 @@
+# -*- coding: utf-8 -*-
+#
+# This copyrighted material is made available to anyone wishing to use,
+# modify, copy, or redistribute it subject to the terms and conditions of
+# the GNU General Public License v.2, or (at your option) any later version.
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY expressed or implied, including the implied warranties of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU General
+# Public License for more details.  You should have received a copy of the
+# GNU General Public License along with this program; if not, write to the
+# Free Software Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA
+# 02110-1301, USA.  Any Red Hat trademarks that are incorporated in the
+# source code or documentation are not subject to the GNU General Public
+# License and may only be used or replicated with the express permission of
+# Red Hat, Inc.
+#
+# Author(s): Vojtech Trefny <mail@vojtechtrefny.cz>
+#
+# ---------------------------------------------------------------------------- #
+
+import zlib
+import heapq
+import string
+
+import numpy
+from scipy import spatial
+from collections import Counter
+
+from utils import IGNORED_TAGS
+
+# ---------------------------------------------------------------------------- #
+
+
+class RecommendationCancelled(Exception):
+    """ Raised when the recommendation computation was cancelled """
+
+
+def most_common(counter, num):
+    """ Like Counter.most_common but ties are ordered by the key, so the
+        result does not depend on the order the counts were added in
+    """
+
+    return heapq.nsmallest(num, counter.items(), key=lambda item: (-item[1], item[0]))
+
+
+def count_vocabulary(applications, words=True):
+    """ Tags and words counts among all applications (words are None
+        if not 'words')
+    """
+
+    all_tags = {}
+    all_words = {} if words else None
+
+    for app in applications:
+        for tag in app.tags:
+            if tag[0] not in all_tags:
+                all_tags[tag[0]] = max(tag[1], 0)
+            elif tag[1] > 0:
+                all_tags[tag[0]] += tag[1]
+
+        if not words:
+            continue
+
+        for word in app.words:
+            if word[0] not in all_words:
+                all_words[word[0]] = word[1]
+            else:
+                all_words[word[0]] += word[1]
+
+    return all_tags, all_words
+
+
+class HashedWords(object):
+    """ Hashed feature space for description words
+
+        Words are mapped to 'dimension' buckets, words with less than
+        'min_count' occurrences among all applications (mostly noise like
+        URLs or version strings) are pruned. The mapping is computed once
+        for the catalog by 'fit', afterwards only bucket ids of the
+        applications are kept, so the memory does not grow with the words
+        vocabulary.
+    """
+
+    def __init__(self, dimension=4096, min_count=2):
+        self.dimension = dimension
+        self.min_count = min_count
+
+        self.all_words = None   # bucket -> count among all applications
+        self._app_words = {}    # application name -> [(bucket, count)]
+
+    def bucket(self, word):
+        # punctuation variants of the same word share the bucket
+        return zlib.crc32(word.strip(string.punctuation).encode("utf-8")) % self.dimension
+
+    def fit(self, applications, all_words=None):
+        """ Compute buckets of the words of all applications
+
+            'all_words' are words counts among all applications (e.g. from
+            the shared catalog), they are counted if not given.
+        """
+
+        if all_words is None:
+            _tags, all_words = count_vocabulary(applications)
+
+        self.all_words = Counter()
+        self._app_words = {}
+
+        for app in applications:
+            buckets = Counter()
+            for word, value in app.words:
+                if all_words.get(word, 0) >= self.min_count:
+                    buckets[self.bucket(word)] += value
+
+            self._app_words[app.name] = sorted(buckets.items())
+            self.all_words.update(buckets)
+
+    def words(self, app):
+        """ (bucket, count) pairs of the application, applications not in
+            the fitted catalog have no words
+        """
+
+        return self._app_words.get(app.name, [])
+
+
+class UserProfile(object):
+
+    def __init__(self, applications, all_tags=None, all_words=None, hashed_words=None):
+        self.applications = applications
+
+        # optional hashed feature space for words (HashedWords), buckets
+        # are used instead of the words
+        self.hashed_words = hashed_words
+        if hashed_words is not None:
+            if hashed_words.all_words is None:
+                hashed_words.fit(applications, all_words)
+            all_words = hashed_words.all_words
+
+        # all tags and words are same for all users, they can be precomputed
+        # (e.g. by the shared catalog)
+        if all_tags is None or all_words is None:
+            counted_tags, counted_words = count_vocabulary(applications, words=all_words is None)
+            all_tags = counted_tags if all_tags is None else all_tags
+            all_words = counted_words if all_words is None else all_words
+
+        self._favourite_categories = Counter()
+        self._favourite_tags = Counter()
+        self._all_tags = all_tags
+        self._all_tags_total = None
+        self._tags_by_category = {}
+
+        self._favourite_words = Counter()
+        self._all_words = all_words
+        self._all_words_total = None
+        self._words_by_category = {}
+
+        self._create_profile()
+
+    def _create_profile(self):
+        """ Create user profile based on installed applications """
+
+        for app in self.applications:
+            if app.installed:
+                self._update_installed(app, 1)
+
+    def _update_installed(self, app, sign):
+        """ Add (sign 1) or remove (sign -1) installed application counts """
+
+        self._favourite_categories[app.category] += sign
+
+        if app.category not in self._tags_by_category:
+            self._tags_by_category[app.category] = Counter()
+            self._words_by_category[app.category] = Counter()
+
+        for tag, value in app.tags:
+            self._tags_by_category[app.category][tag] += sign * value
+            if sign < 0 and not self._tags_by_category[app.category][tag]:
+                del self._tags_by_category[app.category][tag]
+            if value > 0:
+                self._favourite_tags[tag] += sign * value
+                if not self._favourite_tags[tag]:
+                    del self._favourite_tags[tag]
+
+        for word, value in self.app_words(app):
+            self._words_by_category[app.category][word] += sign * value
+            if sign < 0 and not self._words_by_category[app.category][word]:
+                del self._words_by_category[app.category][word]
+            if value > 0:
+                self._favourite_words[word] += sign * value
+                if not self._favourite_words[word]:
+                    del self._favourite_words[word]
+
+        if not self._favourite_categories[app.category]:
+            del self._favourite_categories[app.category]
+            del self._tags_by_category[app.category]
+            del self._words_by_category[app.category]
+
+    def app_words(self, app):
+        """ Words of the application as (word, count) pairs, (bucket, count)
+            pairs for hashed words
+        """
+
+        if self.hashed_words is not None:
+            return self.hashed_words.words(app)
+        return app.words
+
+    def add_installed(self, app):
+        """ Update the profile with newly installed application """
+
+        self._update_installed(app, 1)
+
+    def remove_installed(self, app):
+        """ Update the profile with removed application """
+
+        self._update_installed(app, -1)
+
+    @property
+    def favourite_categories(self):
+        """ Most common categories among installed applications """
+
+        return self._favourite_categories
+
+    @property
+    def all_tags(self):
+        """ Tags counts among all applications """
+
+        return self._all_tags
+
+    @property
+    def all_tags_total(self):
+        """ Sum of tags counts among all applications """
+
+        if self._all_tags_total is None:
+            self._all_tags_total = sum(self._all_tags.values())
+
+        return self._all_tags_total
+
+    @property
+    def favourite_tags(self):
+        """ Most common tags among installed applications """
+
+        return self._favourite_tags
+
+    def get_tags_for_category(self, category):
+        """ Most common tags among installed applications in given category """
+
+        return most_common(self._tags_by_category[category], 10)
+
+    @property
+    def all_words(self):
+        """ Tags counts among all applications """
+
+        return self._all_words
+
+    @property
+    def all_words_total(self):
+        """ Sum of words counts among all applications """
+
+        if self._all_words_total is None:
+            self._all_words_total = sum(self._all_words.values())
+
+        return self._all_words_total
+
+    @property
+    def favourite_words(self):
+        """ Most common tags among installed applications """
+
+        return self._favourite_words
+
+    def get_words_for_category(self, category):
+        """ Most common tags among installed applications in given category """
+
+        return most_common(self._words_by_category[category], 10)
+
+    def __str__(self):
+        s = "<b>Total applications available:</b> %d\n" % len(self.applications)
+        s += "<b>Total applications installed:</b> %d\n" % len([app for app in self.applications if app.installed])
+
+        s += "<b>Favourite tags:</b>\n"
+
+        for tag, num in self.favourite_tags.most_common(20):
+            s += "\t• %s (%d)\n" % (tag, num)
+
+        # hashed words are just bucket numbers, not worth showing
+        if self.hashed_words is None:
+            s += "<b>Favourite words:</b>\n"
+
+            for word, num in most_common(self.favourite_words, 20):
+                s += "\t• %s (%d)\n" % (word, num)
+
+        s += "<b>Favourite categories:</b>\n"
+
+        for cat, fav in most_common(self.favourite_categories, 6):
+            if cat == "Other":
+                continue
+            s += "\t• %s (%d)\n" % (cat, fav)
+            for tag, num in self.get_tags_for_category(cat):
+                s += "\t\t\t• %s (%d)\n" % (tag, num)
+            if self.hashed_words is None:
+                s += "\t\t\t-----------------\n"
+                for word, num in self.get_words_for_category(cat):
+                    s += "\t\t\t• %s (%d)\n" % (word, num)
+
+        return s
+
+
+class AppRecommendation(object):
+
+    def __init__(self, user_profile, collaborative=None, cf_weight=1.0, cancelled=None):
+
+        self.user_profile = user_profile
+
+        # optional callable, when it returns True the computation stops with
+        # RecommendationCancelled
+        self.cancelled = cancelled
+
+        # optional collaborative filtering model blended with content scores
+        self.collaborative = collaborative
+        self.cf_weight = cf_weight
+        self._cf_scores = None
+
+        self._recommended = []
+        self._ranked = []
+        self._by_category = {}
+        self._explanations = {}
+        self._apps_by_name = None
+
+    @property
+    def recommended(self):
+        """ List of recommended applications """
+
+        if not self._recommended:
+            self._recommended = self._build_recommended()
+
+        return self._recommended
+
+    @property
+    def ranked(self):
+        """ Recommended applications as (app, factor) from the best factor
+            (the 'recommended' list is ordered by category)
+        """
+
+        if not self._recommended:
+            self._recommended = self._build_recommended()
+
+        return self._ranked
+
+    @property
+    def cf_scores(self):
+        """ Collaborative filtering scores for not installed applications """
+
+        if self._cf_scores is None:
+            self._cf_scores = {}
+            if self.collaborative is not None:
+                installed = [app.name for app in self.user_profile.applications if app.installed]
+                self._cf_scores = self.collaborative.score(installed)
+
+        return self._cf_scores
+
+    def _compare_tags(self, compare_type, tags1, tags2):
+        """ Compare two sets of tags/words based on its similarity """
+
+        if compare_type == "tags":
+            # normalize tags values
+            tags1_normalized = []
+            for (tag, value) in tags1:
+                if tag in IGNORED_TAGS:  # remove tags we ignore
+                    continue
+                count = self.user_profile.all_tags[tag]
+                if count > 0:
+                    tf = value / sum([val for _tag, val in tags1])
+                    idf = self.user_profile.all_tags_total / count
+                    value = tf*idf
+                tags1_normalized.append((tag, value))
+            tags2_normalized = []
+            for (tag, value) in tags2:
+                if tag in IGNORED_TAGS:  # remove tags we ignore
+                    continue
+                count = self.user_profile.all_tags[tag]
+                if count > 0:
+                    tf = value / sum([val for _tag, val in tags2])
+                    idf = self.user_profile.all_tags_total / count
+                    value = tf*idf
+                tags2_normalized.append((tag, value))
+        elif compare_type == "words":
+            tags1_normalized = []
+            for (tag, value) in tags1:
+                count = self.user_profile.all_words[tag]
+                if count > 0:
+                    tf = value / sum([val for _tag, val in tags1])
+                    idf = self.user_profile.all_words_total / count
+                    value = tf*idf
+                tags1_normalized.append((tag, value))
+            tags2_normalized = []
+            for (tag, value) in tags2:
+                count = self.user_profile.all_words[tag]
+                if count > 0:
+                    tf = value / sum([val for _tag, val in tags2])
+                    idf = self.user_profile.all_words_total / count
+                    value = tf*idf
+                tags2_normalized.append((tag, value))
+
+        # both set of tags needs to have same tags (even with value 0) for cosine
+        # similarity comparison
+        tags1_tags = [tag for tag, _val in tags1_normalized]
+        tags2_tags = [tag for tag, _val in tags2_normalized]
+
+        for (tag, _value) in tags1_normalized:
+            if tag not in tags2_tags:
+                tags2_normalized.append((tag, 0))
+
+        for (tag, _value) in tags2_normalized:
+            if tag not in tags1_tags:
+                tags1_normalized.append((tag, 0))
+
+        # sort both sets
+        tags1_normalized.sort()
+        tags2_normalized.sort()
+
+        # vectors -- only normalized values, not the tags names
+        vectorA = [val for _tag, val in tags1_normalized]
+        vectorB = [val for _tag, val in tags2_normalized]
+
+        similarity = 1 - spatial.distance.cosine(vectorA, vectorB)
+
+        return similarity
+
+    def _build_recommended(self):
+        """ Build list of recommended applications """
+
+        recommended = []
+        ranked = []
+
+        # per category based recommendation
+        for category, _fav in most_common(self.user_profile.favourite_categories, 5):
+            self._check_cancelled()
+            if category not in self._by_category:
+                self._by_category[category] = self._recommend_category(category)
+
+            for app, factor in self._by_category[category]:
+                recommended.append(app.name)
+                ranked.append((app, factor))
+
+        # apps installed together with the user's apps in other categories
+        if self.collaborative is not None:
+            for app, factor in self._recommend_collaborative(recommended):
+                recommended.append(app.name)
+                ranked.append((app, factor))
+
+        ranked.sort(key=lambda item: (-item[1], item[0].name))
+        self._ranked = ranked
+
+        return recommended
+
+    def _recommend_collaborative(self, recommended):
+        """ Applications with the best collaborative scores not recommended
+            by the content based recommendation
+        """
+
+        if self._apps_by_name is None:
+            self._apps_by_name = {app.name: app for app in self.user_profile.applications}
+
+        most_rec = Counter()
+        for name, score in self.cf_scores.items():
+            app = self._apps_by_name.get(name)
+            if app is not None and not app.installed and name not in recommended:
+                most_rec[app] = self.cf_weight * score
+
+        for app, factor in most_rec.most_common(4):
+            self._explanations[app.name] = ([], factor)
+
+        return most_rec.most_common(4)
+
+    def _recommend_category(self, category):
+        """ Most recommended applications from given category """
+
+        category_tags = self.user_profile.get_tags_for_category(category)
+        category_words = self.user_profile.get_words_for_category(category)
+
+        most_rec = Counter()
+
+        for app in self.user_profile.applications:
+            if app.installed:
+                continue
+            if app.category == category:
+                self._check_cancelled()
+                similarity = [self._compare_tags("tags", category_tags, app.tags),
+                              self._compare_tags("words", category_words,
+                                                 self.user_profile.app_words(app))]
+                if app.name in self.cf_scores:
+                    # apps without tags or words (similarity not defined)
+                    # can still be recommended based on the collaborative score
+                    similarity = numpy.nan_to_num(similarity)
+                rec_factor = sum(similarity) + self.cf_weight * self.cf_scores.get(app.name, 0)
+                if rec_factor >= 0:
+                    most_rec[app] = rec_factor
+
+        for app, factor in most_rec.most_common(4):
+            # debug information is created only when asked for, see 'explain'
+            self._explanations[app.name] = (category_tags, factor)
+
+        return most_rec.most_common(4)
+
+    def _check_cancelled(self):
+        if self.cancelled is not None and self.cancelled():
+            raise RecommendationCancelled()
+
+    def explain(self, app):
+        """ Debug information (RecDebug) about recommendation of the app
+            or None if the app is not recommended
+        """
+
+        if app.name not in self._explanations or app.name not in self._recommended:
+            return None
+
+        category_tags, factor = self._explanations[app.name]
+
+        return RecDebug(app_name=app.name, app_tags=app.tags,
+                        app_words=app.words, app_category=app.category,
+                        category_tags=category_tags,
+                        cf_score=self.cf_scores.get(app.name),
+                        similarity=factor)
+
+    def update(self, categories):
+        """ Re-score only given categories after change of installed applications """
+
+        if self.collaborative is not None:
+            # collaborative scores depend on the whole installed set
+            self._cf_scores = None
+            self._by_category = {}
+        else:
+            for category in categories:
+                self._by_category.pop(category, None)
+
+        # empty until the new list is built (the build can be cancelled)
+        self._recommended = []
+        self._recommended = self._build_recommended()
+
+
+class RecDebug(object):
+    """ Simple class holding debug information about recommendation """
+
+    def __init__(self, **kwargs):
+        self.app_name = kwargs.get("app_name")
+        self.app_tags = kwargs.get("app_tags")
+        self.app_words = kwargs.get("app_words")
+        self.app_category = kwargs.get("app_category")
+        self.category_tags = kwargs.get("category_tags")
+        self.cf_score = kwargs.get("cf_score")
+        self.similarity = kwargs.get("similarity")
+
+    def __str__(self):
+        s = "<b>Recommendation for %s based on:</b>\n" % self.app_name
+        s += "\t• Category tags (%s):\n" % self.app_category
+        for tag, num in self.category_tags:
+            s += "\t\t\t• %s (%d)\n" % (tag, num)
+        s += "\t• Application tags:\n"
+        for tag, num in self.app_tags:
+            s += "\t\t\t• %s (%d)\n" % (tag, num)
+        s += "\t• Application words:\n"
+        for word, num in self.app_words:
+            s += "\t\t\t• %s (%d)\n" % (word, num)
+        if self.cf_score is not None:
+            s += "\t• Collaborative score: %s\n" % self.cf_score
+        s += "\t• Similarity: %s\n" % self.similarity
+
+        return s
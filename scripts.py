@@ -20,99 +20,68 @@
 
 import os
 
-import xml.etree.ElementTree as ET
-from collections import Counter
-import matplotlib.pyplot as pyplot
+from concurrent.futures import ProcessPoolExecutor
 
-# ---------------------------------------------------------------------------- #
+import matplotlib
+matplotlib.use("Agg")  # headless, we only save the plots
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
 
-XML_PATH = "data/applications.xml"
+from stats import CatalogStatistics, STATS_PATH
+from utils import XML_PATH
 
 # ---------------------------------------------------------------------------- #
 
 
-def analyze_apps():
-    """ Analyze tag and term distribution in application data """
+def _plot_bars(items, path, bottom):
+    """ Plot (name, value) pairs as a bar plot and save it to 'path' """
 
-    if not os.path.isfile(XML_PATH):
-        print("Xml file '%s' with app data not found. Run 'XmlBuilder'" \
-              "from 'utils.py' first." % XML_PATH)
-        return 1
+    names = [name for name, _val in items]
+    values = [val for _name, val in items]
 
-    tags = Counter()
-    words = Counter()
-    categories = Counter()
+    figure = Figure()
+    FigureCanvasAgg(figure)
+    axes = figure.add_subplot(111)
 
-    # read the xml with data
-    tree = ET.parse(XML_PATH)
-    root = tree.getroot()
+    plot = axes.bar(range(len(names)), values)
+    xticks_pos = [0.65*patch.get_width() + patch.get_xy()[0] for patch in plot]
+    axes.set_xticks(xticks_pos)
+    axes.set_xticklabels(names, rotation=45, ha="right")
+    figure.subplots_adjust(bottom=bottom)
+    figure.savefig(path)
 
-    # read tags and words (terms) from the xml
-    for app in root:
-        category = app[3].text
 
-        if category not in categories.keys():
-            categories[category] = 1
-        else:
-            categories[category] += 1
+def analyze_apps():
+    """ Analyze tag and term distribution in application data """
 
-        for t in app[4]:
-            tag_name = t.get("tag")
-            tag_value = int(t.get("value"))
+    have_xml = os.path.isfile(XML_PATH)
 
-            if tag_name not in tags.keys():
-                tags[tag_name] = tag_value
-            else:
-                tags[tag_name] += tag_value
+    if not os.path.isfile(STATS_PATH):
+        if not have_xml:
+            print("Xml file '%s' with app data not found. Run 'XmlBuilder'" \
+                  "from 'builder.py' first." % XML_PATH)
+            return 1
 
-        for w in app[5]:
-            word_name = w.get("word")
-            word_value = int(w.get("value"))
+        # catalog built without statistics -- convert it once
+        CatalogStatistics.from_xml(XML_PATH).save(STATS_PATH)
 
-            # just ignore special characters
-            if word_name in ("*", "-"):
-                continue
+    elif have_xml and os.path.getmtime(XML_PATH) > os.path.getmtime(STATS_PATH):
+        # catalog replaced without a rebuild, statistics are outdated
+        print("Statistics in '%s' are older than '%s', regenerating them." % (STATS_PATH, XML_PATH))
+        CatalogStatistics.from_xml(XML_PATH).save(STATS_PATH)
 
-            if word_name not in words.keys():
-                words[word_name] = word_value
-            else:
-                words[word_name] += word_value
+    statistics = CatalogStatistics.load(STATS_PATH)
 
     # just most common are interesting for barplots
-    tags = tags.most_common(30)
-    words = words.most_common(30)
-    categories = categories.most_common(100)  # we want all categories
+    plots = ((statistics.tags.most_common(30), "data/tags_graph.png", 0.2),
+             (statistics.words.most_common(30), "data/words_graph.png", 0.2),
+             (statistics.categories.most_common(100), "data/categories_graph.png", 0.4))  # we want all categories
 
     # plot the histograms
-    tag_names = [tag for tag, _val in tags]
-    tag_values = [val for _tag, val in tags]
-
-    pyplot.figure(1)
-    plot1 = pyplot.bar(range(len(tag_names)), tag_values)
-    xticks_pos = [0.65*patch.get_width() + patch.get_xy()[0] for patch in plot1]
-    pyplot.xticks(xticks_pos, tag_names, rotation=45, ha="right")
-    pyplot.subplots_adjust(bottom=0.2)
-    pyplot.savefig("data/tags_graph.png")
-
-    word_names = [word for word, _val in words]
-    word_values = [val for _word, val in words]
-
-    pyplot.figure(2)
-    plot2 = pyplot.bar(range(len(word_names)), word_values)
-    xticks_pos = [0.65*patch.get_width() + patch.get_xy()[0] for patch in plot2]
-    pyplot.xticks(xticks_pos, word_names, rotation=45, ha="right")
-    pyplot.subplots_adjust(bottom=0.2)
-    pyplot.savefig("data/words_graph.png")
-
-    cat_names = [cat for cat, _val in categories]
-    cat_values = [val for _cat, val in categories]
-
-    pyplot.figure(3)
-    plot2 = pyplot.bar(range(len(cat_names)), cat_values)
-    xticks_pos = [0.65*patch.get_width() + patch.get_xy()[0] for patch in plot2]
-    pyplot.xticks(xticks_pos, cat_names, rotation=45, ha="right")
-    pyplot.subplots_adjust(bottom=0.4)
-    pyplot.savefig("data/categories_graph.png")
+    with ProcessPoolExecutor(max_workers=len(plots)) as executor:
+        futures = [executor.submit(_plot_bars, *plot) for plot in plots]
+        for future in futures:
+            future.result()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,92 @@
+# -*- coding: utf-8 -*-
+#
+# This copyrighted material is made available to anyone wishing to use,
+# modify, copy, or redistribute it subject to the terms and conditions of
+# the GNU General Public License v.2, or (at your option) any later version.
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY expressed or implied, including the implied warranties of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU General
+# Public License for more details.  You should have received a copy of the
+# GNU General Public License along with this program; if not, write to the
+# Free Software Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA
+# 02110-1301, USA.  Any Red Hat trademarks that are incorporated in the
+# source code or documentation are not subject to the GNU General Public
+# License and may only be used or replicated with the express permission of
+# Red Hat, Inc.
+#
+# Author(s): Vojtech Trefny <mail@vojtechtrefny.cz>
+#
+# ---------------------------------------------------------------------------- #
+
+import json
+import xml.etree.ElementTree as ET
+from collections import Counter
+
+# ---------------------------------------------------------------------------- #
+
+STATS_PATH = "data/statistics.json"
+
+# only most common tags and words are saved to keep the file small
+STATS_LIMIT = 100
+
+# ---------------------------------------------------------------------------- #
+
+
+class CatalogStatistics(object):
+    """ Tag, word and category distributions of the application catalog """
+
+    def __init__(self, tags=None, words=None, categories=None, applications=0):
+        self.tags = Counter(tags or {})
+        self.words = Counter(words or {})
+        self.categories = Counter(categories or {})
+        self.applications = applications
+
+    def add(self, category, tags, words):
+        """ Add one application (tags and words as (name, value) pairs) """
+
+        self.applications += 1
+        self.categories[category] += 1
+
+        for tag, value in tags:
+            self.tags[tag] += int(value)
+
+        for word, value in words:
+            # just ignore special characters
+            if word in ("*", "-"):
+                continue
+            self.words[word] += int(value)
+
+    @classmethod
+    def from_xml(cls, xml_path):
+        """ Compute the statistics from an existing XML catalog """
+
+        statistics = cls()
+
+        for app in ET.parse(xml_path).getroot():
+            statistics.add(app[3].text,
+                           [(t.get("tag"), t.get("value")) for t in app[4]],
+                           [(w.get("word"), w.get("value")) for w in app[5]])
+
+        return statistics
+
+    @classmethod
+    def load(cls, path=STATS_PATH):
+        """ Load statistics saved by 'save' """
+
+        with open(path, "r") as f:
+            data = json.load(f)
+
+        return cls(tags=dict(data["tags"]), words=dict(data["words"]),
+                   categories=dict(data["categories"]),
+                   applications=data["applications"])
+
+    def save(self, path=STATS_PATH):
+        """ Save the statistics as a compact JSON file """
+
+        data = {"applications": self.applications,
+                "tags": self.tags.most_common(STATS_LIMIT),
+                "words": self.words.most_common(STATS_LIMIT),
+                "categories": self.categories.most_common()}
+
+        with open(path, "w") as f:
+            json.dump(data, f, separators=(",", ":"))
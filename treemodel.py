@@ -0,0 +1,185 @@
+# -*- coding: utf-8 -*-
+#
+# This copyrighted material is made available to anyone wishing to use,
+# modify, copy, or redistribute it subject to the terms and conditions of
+# the GNU General Public License v.2, or (at your option) any later version.
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY expressed or implied, including the implied warranties of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU General
+# Public License for more details.  You should have received a copy of the
+# GNU General Public License along with this program; if not, write to the
+# Free Software Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA
+# 02110-1301, USA.  Any Red Hat trademarks that are incorporated in the
+# source code or documentation are not subject to the GNU General Public
+# License and may only be used or replicated with the express permission of
+# Red Hat, Inc.
+#
+# Author(s): Vojtech Trefny <mail@vojtechtrefny.cz>
+#
+# ---------------------------------------------------------------------------- #
+
+import gi
+gi.require_version("Gtk", "3.0")
+gi.require_version("GdkPixbuf", "2.0")
+from gi.repository import Gtk, GObject, GdkPixbuf
+
+import bisect
+from array import array
+
+# ---------------------------------------------------------------------------- #
+
+# application, recommended, installed, icon, description (markup)
+COLUMN_TYPES = (object, bool, bool, GdkPixbuf.Pixbuf, str)
+
+# ---------------------------------------------------------------------------- #
+
+
+class CatalogTreeModel(GObject.Object, Gtk.TreeModel):
+    """ Lazy list model showing applications directly from the catalog
+
+        Rows of the recommended, installed and available ("all") views are
+        precomputed index arrays, icons and markup are created only for
+        rows the view actually asks for.
+    """
+
+    def __init__(self, applications, markup_func, icon_func, view_type="rec"):
+        GObject.Object.__init__(self)
+
+        self.applications = applications
+        self.markup_func = markup_func
+        self.icon_func = icon_func
+
+        self._markup = {}
+        self._icons = {}
+        self._positions = {app: idx for idx, app in enumerate(applications)}
+
+        self._views = {}
+        self._build_views()
+
+        self.view_type = view_type
+        self._rows = self._views[view_type]
+
+    def _build_views(self):
+        """ Precompute application indices for all views """
+
+        self._views = {"rec": array("I"), "inst": array("I"), "all": array("I")}
+
+        for idx, app in enumerate(self.applications):
+            if app.recommended:
+                self._views["rec"].append(idx)
+            if app.installed:
+                self._views["inst"].append(idx)
+            else:
+                self._views["all"].append(idx)
+
+    def set_view(self, view_type):
+        """ Switch to a different view, the model should be detached from
+            the view while switching
+        """
+
+        self.view_type = view_type
+        self._rows = self._views[view_type]
+
+    def update(self, apps):
+        """ Update views after installed/recommended state of 'apps' changed
+
+            Rows of the current view are updated in place (with the row
+            signals), so the view keeps its scroll position and selection.
+        """
+
+        for app in sorted(apps, key=self._positions.get):
+            idx = self._positions[app]
+            membership = (("rec", app.recommended), ("inst", app.installed),
+                          ("all", not app.installed))
+
+            for view_type, member in membership:
+                rows = self._views[view_type]
+                current = rows is self._rows
+                pos = bisect.bisect_left(rows, idx)
+                present = pos < len(rows) and rows[pos] == idx
+
+                if member and not present:
+                    rows.insert(pos, idx)
+                    if current:
+                        self.row_inserted(Gtk.TreePath([pos]), self._iter(pos)[1])
+                elif not member and present:
+                    del rows[pos]
+                    if current:
+                        self.row_deleted(Gtk.TreePath([pos]))
+                elif member and current:
+                    self.row_changed(Gtk.TreePath([pos]), self._iter(pos)[1])
+
+    # iters store index to the current view + 1 (0 is not a valid user_data)
+    def _iter(self, row, iter_=None):
+        if row < 0 or row >= len(self._rows):
+            return (False, None)
+
+        if iter_ is None:
+            iter_ = Gtk.TreeIter()
+        iter_.user_data = row + 1
+
+        return (True, iter_)
+
+    def _app_index(self, iter_):
+        return self._rows[iter_.user_data - 1]
+
+    def do_get_flags(self):
+        return Gtk.TreeModelFlags.LIST_ONLY
+
+    def do_get_n_columns(self):
+        return len(COLUMN_TYPES)
+
+    def do_get_column_type(self, column):
+        return COLUMN_TYPES[column]
+
+    def do_get_iter(self, path):
+        return self._iter(path.get_indices()[0])
+
+    def do_get_path(self, iter_):
+        return Gtk.TreePath([iter_.user_data - 1])
+
+    def do_get_value(self, iter_, column):
+        idx = self._app_index(iter_)
+        app = self.applications[idx]
+
+        if column == 0:
+            return app
+        elif column == 1:
+            return app.recommended
+        elif column == 2:
+            return app.installed
+        elif column == 3:
+            if idx not in self._icons:
+                self._icons[idx] = self.icon_func(app)
+            return self._icons[idx]
+        else:
+            if idx not in self._markup:
+                self._markup[idx] = self.markup_func(app)
+            return self._markup[idx]
+
+    def do_iter_next(self, iter_):
+        return self._iter(iter_.user_data, iter_)
+
+    def do_iter_previous(self, iter_):
+        return self._iter(iter_.user_data - 2, iter_)
+
+    def do_iter_children(self, parent):
+        if parent is not None:
+            return (False, None)
+        return self._iter(0)
+
+    def do_iter_has_child(self, iter_):
+        return False
+
+    def do_iter_n_children(self, iter_):
+        if iter_ is not None:
+            return 0
+        return len(self._rows)
+
+    def do_iter_nth_child(self, parent, n):
+        if parent is not None:
+            return (False, None)
+        return self._iter(n)
+
+    def do_iter_parent(self, child):
+        return (False, None)
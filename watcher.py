@@ -0,0 +1,112 @@
+# -*- coding: utf-8 -*-
+#
+# This copyrighted material is made available to anyone wishing to use,
+# modify, copy, or redistribute it subject to the terms and conditions of
+# the GNU General Public License v.2, or (at your option) any later version.
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY expressed or implied, including the implied warranties of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU General
+# Public License for more details.  You should have received a copy of the
+# GNU General Public License along with this program; if not, write to the
+# Free Software Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA
+# 02110-1301, USA.  Any Red Hat trademarks that are incorporated in the
+# source code or documentation are not subject to the GNU General Public
+# License and may only be used or replicated with the express permission of
+# Red Hat, Inc.
+#
+# Author(s): Vojtech Trefny <mail@vojtechtrefny.cz>
+#
+# ---------------------------------------------------------------------------- #
+
+import os
+import sys
+import rpm
+
+from gi.repository import Gio, GLib
+from concurrent.futures import ThreadPoolExecutor
+
+from reader import read_installed_names
+
+# ---------------------------------------------------------------------------- #
+
+# rpm writes the database several times during one transaction, wait for
+# it to settle down before reading the installed packages again
+SETTLE_TIMEOUT = 1000  # ms
+
+# database files of the sqlite, ndb and bdb backends, other files in the
+# directory (locks etc.) are ignored
+DB_FILES = ("rpmdb.sqlite", "rpmdb.sqlite-wal", "Packages.db", "Packages")
+DB_EVENTS = (Gio.FileMonitorEvent.CHANGES_DONE_HINT, Gio.FileMonitorEvent.CREATED,
+             Gio.FileMonitorEvent.DELETED, Gio.FileMonitorEvent.RENAMED)
+
+# ---------------------------------------------------------------------------- #
+
+
+class RpmdbWatcher(object):
+    """ Class watching rpmdb (inotify via Gio) for installed packages changes
+
+        'callback' is called with sets of added and removed package names.
+        The rpmdb is read in a worker thread, the callback is called from
+        the main loop.
+    """
+
+    def __init__(self, installed, callback, path=None):
+
+        self.installed = set(installed)
+        self.callback = callback
+
+        if path is None:
+            path = rpm.expandMacro("%{_dbpath}")
+
+        self._timeout_id = None
+        self._executor = ThreadPoolExecutor(max_workers=1)
+
+        self._monitor = Gio.File.new_for_path(path).monitor_directory(Gio.FileMonitorFlags.WATCH_MOVES, None)
+        self._monitor.connect("changed", self._on_changed)
+
+    def _on_changed(self, monitor, changed_file, other_file, event_type):
+        if event_type not in DB_EVENTS:
+            return
+
+        names = [os.path.basename(f.get_path()) for f in (changed_file, other_file) if f is not None]
+        if not any(name in DB_FILES for name in names):
+            return
+
+        if self._timeout_id is not None:
+            GLib.source_remove(self._timeout_id)
+        self._timeout_id = GLib.timeout_add(SETTLE_TIMEOUT, self._check_installed)
+
+    def _check_installed(self):
+        self._timeout_id = None
+
+        # reading all headers takes a while, don't block the main loop
+        future = self._executor.submit(read_installed_names)
+        future.add_done_callback(lambda f: GLib.idle_add(self._on_installed_read, f))
+
+        return False
+
+    def _on_installed_read(self, future):
+        if future.cancelled():
+            return False
+        if future.exception() is not None:
+            print("Reading installed packages failed: %s" % future.exception(), file=sys.stderr)
+            return False
+
+        installed = future.result()
+        added = installed - self.installed
+        removed = self.installed - installed
+        self.installed = installed
+
+        if added or removed:
+            self.callback(added, removed)
+
+        return False
+
+    def stop(self):
+        """ Stop watching the rpmdb """
+
+        if self._timeout_id is not None:
+            GLib.source_remove(self._timeout_id)
+            self._timeout_id = None
+        self._monitor.cancel()
+        self._executor.shutdown(wait=False)